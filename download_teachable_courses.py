@@ -1,62 +1,182 @@
 import csv
+import email.utils
+import errno
+import functools
 import os
 import pathlib
-import re
+import random
 import sys
 import time
-import traceback
 import unicodedata
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, AsyncContextManager, AsyncIterator, Dict, List, Optional, Set
 
 import asyncio
 import aiohttp
+import orjson
 import signal
 
 from dotenv import load_dotenv
 from loguru import logger
+from yarl import URL
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
 from dataclasses import dataclass
-from asyncio import Queue
 from collections import defaultdict
 from datetime import datetime, timedelta, timezone, UTC
 import json
 
+try:
+    import uvloop  # Faster event loop; not available on Windows
+except ImportError:
+    uvloop = None
+
 # Constants
 API_MAX_CONCURRENT_CALLS = 2  # <--- Limit total Teachable API calls at once
 MAX_RETRIES = 5
 DELAY_FACTOR = 3
 INITIAL_DELAY = 20
+API_CACHE_FILENAME = ".teachable_api_cache.json"  # ETag/Last-Modified cache kept in the output directory
+API_CACHE_MAX_ENTRIES = 5000  # Oldest cached course/lecture/video responses are dropped beyond this
+NEGATIVE_CACHE_TTL = 60  # Seconds a 4xx API response is replayed instead of re-requested
 MAX_CONCURRENT_DOWNLOADS = 3  # Set concurrency for attachment downloads
+MAX_CONCURRENT_COURSES = 5  # Courses walked in parallel; API calls stay capped by API_MAX_CONCURRENT_CALLS
+DOWNLOAD_READ_BUFSIZE = 1024 * 1024  # aiohttp stream buffer for downloads (default 64KB); also caps chunk size
+RANGE_SPLIT_THRESHOLD = 64 * 1024 * 1024  # Files at least this big are fetched as parallel Range slices
+RANGE_SPLIT_PARTS = 4
+RETRYABLE_STATUSES = frozenset({429, 503, 504})  # API statuses retried after a delay instead of returned
+
+# Characters dropped from (or, for spaces, replaced in) file names by safe_filename()
+_SAFE_FILENAME_TABLE = str.maketrans({**dict.fromkeys('\\/*?:"><|,'), " ": "_"})
+_IOV_MAX = 1024  # Buffers per writev call (the Linux/macOS limit)
+
+# Free-text columns that may carry windows-1252 mojibake and need clean_text()
+_TEXT_COLS = ("course_name", "module_name", "lecture_name", "attachment_name", "text", "name", "heading", "description")
 
 # Load environment variables from .env file
 load_dotenv()
 
+# fsync completed downloads before the final rename (off by default; the .partial rename already guards against torn files)
+FSYNC_DOWNLOADS = os.environ.get("TEACHABLE_FSYNC") == "1"
+
 # Configure loguru
 logger.add(sys.stderr, format="{time} {level} {message}", filter="my_module", level="INFO")
 logger.add("download_teachable_{time:YYYY-MM-DD}.log", rotation="10 MB")
 
+# Allow raising or lowering the API concurrency cap without editing the script
+if api_concurrency := os.environ.get("TEACHABLE_API_CONCURRENCY"):
+    try:
+        # At least one call, or every API request would wait forever
+        API_MAX_CONCURRENT_CALLS = max(1, int(api_concurrency))
+    except ValueError:
+        logger.warning(
+            f"Ignoring invalid TEACHABLE_API_CONCURRENCY={api_concurrency!r}, using {API_MAX_CONCURRENT_CALLS}"
+        )
+
 # --- Helper Functions ---
-def sleep_with_interrupt(duration: float) -> bool:
+async def sleep_with_interrupt(duration: float, stop_event: asyncio.Event) -> bool:
   """Sleeps for the given duration (in seconds), returning early if stop_event is set.
 
   Args:
       duration: The sleep duration in seconds.
+      stop_event: Event that cuts the sleep short when set.
 
   Returns:
       True if the function slept for the full duration, False if it was interrupted.
   """
-  if asyncio.get_event_loop().is_closed():
-      return True  # If loop is closed, we're in an async context
-  return asyncio.get_event_loop().run_until_complete(asyncio.sleep(duration))
+  try:
+      await asyncio.wait_for(stop_event.wait(), timeout=duration)
+  except TimeoutError:
+      return True
+  return False
+
+def backoff_delay(attempt: int, base: float = 0.25, factor: float = 2, cap: float = 30) -> float:
+    """
+    Exponential backoff with jitter for the given (0-based) retry attempt.
+    The jitter keeps concurrent callers from retrying in lockstep.
+    """
+    return min(cap, base * (factor ** attempt)) * random.uniform(0.5, 1.5)
 
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses a Retry-After header (delta-seconds or HTTP-date) into seconds to wait.
+    Returns None when the header is missing or unparseable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+@functools.lru_cache(maxsize=4096)
 def safe_filename(filename: str, max_length: int = 255) -> str:
     """
     Sanitizes a filename by removing unsafe characters and enforcing length limits.
     """
-    filename = re.sub(r"[\\/*?:\"><|]", "", filename)
-    filename = filename.replace(" ", "_")
-    filename = filename.replace(",", "")
-    filename = filename.replace("_-_", "-")
-    return filename[:max_length]
+    return filename.translate(_SAFE_FILENAME_TABLE).replace("_-_", "-")[:max_length]
+
+def write_fully(fd: int, data: bytes, offset: Optional[int] = None) -> None:
+    """
+    Writes all of data to a raw file descriptor, looping over short writes.
+    With an offset the data is written there via os.pwrite, leaving the file position alone.
+    """
+    view = memoryview(data)
+    while view:
+        if offset is None:
+            written = os.write(fd, view)
+        else:
+            written = os.pwrite(fd, view, offset)
+            offset += written
+        view = view[written:]
+
+def write_chunks(fd: int, chunks: List[bytes], offset: Optional[int] = None) -> None:
+    """
+    Writes a list of chunks with vectored os.writev/os.pwritev calls, so a batch
+    needs neither a join copy nor one syscall per chunk. Falls back to one joined write.
+    """
+    if not hasattr(os, "writev" if offset is None else "pwritev"):
+        write_fully(fd, b"".join(chunks), offset)
+        return
+    views = [memoryview(chunk) for chunk in chunks]
+    first = 0
+    while first < len(views):
+        batch = views[first:first + _IOV_MAX]
+        written = os.writev(fd, batch) if offset is None else os.pwritev(fd, batch, offset)
+        if offset is not None:
+            offset += written
+        # Skip the buffers written in full and trim a partially written one
+        while first < len(views) and written >= len(views[first]):
+            written -= len(views[first])
+            first += 1
+        if written:
+            views[first] = views[first][written:]
+
+async def run_to_completion(func, *args) -> Any:
+    """
+    Runs a blocking call in a worker thread. A cancelled caller still waits for the
+    thread to finish, so the file descriptor it uses is not closed under it.
+    """
+    future = asyncio.ensure_future(asyncio.to_thread(func, *args))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.wait([future])
+        raise
+
+async def flush_chunks(fd: int, chunks: List[bytes], offset: Optional[int] = None) -> int:
+    """
+    Writes a batch of downloaded chunks off the event loop and empties the list.
+    Returns the number of bytes written.
+    """
+    batch = chunks.copy()
+    chunks.clear()
+    await run_to_completion(write_chunks, fd, batch, offset)
+    return sum(map(len, batch))
 
 def get_unique_filename(file_path: pathlib.Path) -> pathlib.Path:
     """
@@ -78,11 +198,19 @@ def find_file_by_partial_name(
     """
     Finds a file in a directory whose name contains a specific partial string.
     """
-    for entry in directory.iterdir():
-        if entry.is_file() and partial_name in entry.name:
-            return entry
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if partial_name in entry.name and entry.is_file():
+                return pathlib.Path(entry.path)
     return None
 
+def local_file_size(file_path: pathlib.Path) -> Optional[int]:
+    """Returns the size of a file, or None if it does not exist (one stat call)."""
+    try:
+        return os.stat(file_path).st_size
+    except FileNotFoundError:
+        return None
+
 def rename_course_directory(
     base_dir: pathlib.Path,
     course_id: int,
@@ -143,23 +271,30 @@ def save_data_to_csv(
     if not data:
         return
 
-    # Clean text fields before writing
-    cleaned_data = []
+    fieldnames = list(data[0].keys())
+    # Only the known free-text columns need cleaning; resolve their positions once per file
+    text_idx = [i for i, k in enumerate(fieldnames) if k in _TEXT_COLS]
+
+    # Build plain rows in column order, cleaning text fields on the way (callers keep their data)
+    rows = []
     for row in data:
-        cleaned_row = {k: clean_text(v) if isinstance(v, str) else v for k, v in row.items()}
-        cleaned_data.append(cleaned_row)
+        values = [row.get(k, "") for k in fieldnames]
+        for i in text_idx:
+            v = values[i]
+            # Pure ASCII round-trips through clean_text unchanged, skip the two transcodes
+            if v and not v.isascii():
+                values[i] = clean_text(v)
+        rows.append(values)
 
-    fieldnames = data[0].keys()
     with open(file_path, "w", newline="", encoding="utf-8") as file:
-        writer = csv.DictWriter(
+        writer = csv.writer(
             file,
-            fieldnames=fieldnames,
             delimiter=delimiter,
             quotechar=quotechar,
             quoting=csv.QUOTE_ALL,
         )
-        writer.writeheader()
-        writer.writerows(cleaned_data)  # Write the cleaned data
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
 
 def save_text_attachment(content: str, file_path: pathlib.Path) -> None:
     """Saves a text attachment to a file."""
@@ -168,10 +303,7 @@ def save_text_attachment(content: str, file_path: pathlib.Path) -> None:
 
 def save_json_attachment(content: Dict[str, Any], file_path: pathlib.Path) -> None:
     """Saves a JSON attachment to a file."""
-    import json
-
-    with open(file_path, "w") as file:
-        json.dump(content, file)
+    file_path.write_bytes(orjson.dumps(content))
 
 def clean_text(text: str) -> str:
     """
@@ -183,6 +315,7 @@ def clean_text(text: str) -> str:
         return text.encode("utf-8", errors="replace").decode("utf-8", errors="replace")
 
 
+@functools.lru_cache(maxsize=4096)
 def normalize_utf_filename(attachment_name: str | None) -> str | None:
     if isinstance(attachment_name, str) and attachment_name not in (None, ""):
         try:
@@ -195,36 +328,37 @@ def process_lecture_data(
     lecture: Dict[str, Any], course_id: int, course_name: str, section_position: int, section_name: str
 ) -> List[Dict[str, Any]]:
     """Processes raw lecture data into a list of dictionaries for CSV export"""
-    processed_data = []
-
-    for attachment in lecture["attachments"]:
-        # Normalize attachment name
-        normalized_name = normalize_utf_filename(attachment["name"])
-
-        processed_data.append(
-            {
-                "course_id": course_id,
-                "course_name": course_name,
-                "module_position": section_position,  # Now correctly using section_position
-                "module_id": lecture["section_id"],
-                "module_name": section_name,  # Use section name
-                "lecture_position": lecture["position"],
-                "lecture_id": lecture["id"],
-                "lecture_name": lecture["name"],
-                "lecture_is_published": lecture["is_published"],
-                "attachment_position": attachment["position"],
-                "attachment_id": attachment["id"],
-                "attachment_name": normalized_name,  # Use normalized name
-                "attachment_kind": attachment["kind"],
-                "attachment_url": attachment["url"],
-                "url_thumbnail": attachment.get("url_thumbnail", ""),
-                "media_duration": attachment.get("media_duration", 0),
-                "text": attachment.get("text"),
-                "quiz": attachment.get("quiz"),
-            }
-        )
-
-    return processed_data
+    # Lecture-level values are the same for every attachment row; look them up once
+    module_id = lecture["section_id"]
+    lecture_position = lecture["position"]
+    lecture_id = lecture["id"]
+    lecture_name = lecture["name"]
+    lecture_is_published = lecture["is_published"]
+
+    # Key order here is the CSV column order
+    return [
+        {
+            "course_id": course_id,
+            "course_name": course_name,
+            "module_position": section_position,  # Now correctly using section_position
+            "module_id": module_id,
+            "module_name": section_name,  # Use section name
+            "lecture_position": lecture_position,
+            "lecture_id": lecture_id,
+            "lecture_name": lecture_name,
+            "lecture_is_published": lecture_is_published,
+            "attachment_position": attachment["position"],
+            "attachment_id": attachment["id"],
+            "attachment_name": normalize_utf_filename(attachment["name"]),  # Use normalized name
+            "attachment_kind": attachment["kind"],
+            "attachment_url": attachment["url"],
+            "url_thumbnail": attachment.get("url_thumbnail", ""),
+            "media_duration": attachment.get("media_duration", 0),
+            "text": attachment.get("text"),
+            "quiz": attachment.get("quiz"),
+        }
+        for attachment in lecture["attachments"]
+    ]
 
 def format_filename_for_log(filename: str, max_length: int = 25, spacer: str = '[..]') -> str:
     """
@@ -267,7 +401,7 @@ def format_admin_urls(course_info: Optional[Dict[str, Any]],
     if not frontend_domain or not course_info.get('course_id') or not course_info.get('lecture_id'):
         return ""
 
-    # Instead of including newlines in the message, format each line as a separate log entry
+    # One URL per line; callers append the block to a single log message
     admin_urls = []
     
     # Frontend URL to view the lecture
@@ -285,15 +419,61 @@ def format_admin_urls(course_info: Optional[Dict[str, Any]],
     if url:
         admin_urls.append(f"Direct download attempt: {url}")
     
-    # Return URLs formatted for separate logging
+    # Return URLs as a multi-line block
     return "\n".join(admin_urls)
 
 # --- API Client ---
+class CircuitOpenError(aiohttp.ClientError):
+    """Raised instead of calling the API while the circuit breaker is open"""
+
+@dataclass
+class CircuitBreaker:
+    """
+    Fails API calls fast after repeated server-side failures, instead of burning
+    the full retry budget on every request while Teachable is down.
+    """
+    failure_threshold: int = 10
+    recovery_timeout: float = 30
+    state: str = "closed"  # "closed", "open" or "half-open"
+    fail_count: int = 0
+    opened_at: float = 0.0
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; lets a single probe through once the recovery window has passed"""
+        if self.state == "closed":
+            return True
+        if time.monotonic() - self.opened_at < self.recovery_timeout:
+            return False
+        self.state = "half-open"
+        self.opened_at = time.monotonic()  # Other callers wait another window for the probe's outcome
+        return True
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info("API circuit breaker closed, requests resume.")
+        self.state = "closed"
+        self.fail_count = 0
+
+    def record_failure(self) -> None:
+        self.fail_count += 1
+        if self.state == "half-open" or (self.state == "closed" and self.fail_count >= self.failure_threshold):
+            logger.warning(
+                f"API circuit breaker opened after {self.fail_count} consecutive failures; "
+                f"failing fast for {self.recovery_timeout}s."
+            )
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
 class TeachableAPIClient:
     """
     Asynchronous Teachable API client using aiohttp.
     """
-    def __init__(self, api_key: str, base_url: str = "https://developers.teachable.com/v1"):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://developers.teachable.com/v1",
+        cache_path: Optional[pathlib.Path] = None,
+    ):
         self.api_key = api_key
         self.base_url = base_url
         self.headers = {"accept": "application/json", "apiKey": self.api_key}
@@ -301,24 +481,52 @@ class TeachableAPIClient:
         self.delay_factor = DELAY_FACTOR
         self.initial_delay = INITIAL_DELAY
         self._stop = False
+        self._stop_event = asyncio.Event()  # Wakes retry sleeps on stop()
+        self._resume_at = 0.0  # time.monotonic() before which no new API call starts (after a 429)
         self.session = None
         self.api_calls_semaphore = asyncio.Semaphore(API_MAX_CONCURRENT_CALLS)
+        self.breaker = CircuitBreaker()
+        # Conditional-request cache: url -> {"etag", "last_modified", "body"}, persisted to cache_path.
+        # Only course content is cached (see _is_cacheable); kept in least recently used order
+        self.cache_path = cache_path
+        self._response_cache: Dict[str, Dict[str, Optional[str]]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}  # url -> shared in-flight request
+        self._negative_cache: Dict[str, tuple[float, aiohttp.ClientResponseError]] = {}  # url -> (expiry, 4xx error)
 
     def stop(self) -> None:
         """
         Stops the API client from further requests.
         """
         self._stop = True
+        self._stop_event.set()
+
+    async def _sleep(self, delay: float) -> None:
+        """
+        Waits before a retry, raising CancelledError as soon as the client is stopped.
+        """
+        if not await sleep_with_interrupt(delay, self._stop_event):
+            raise asyncio.CancelledError("API client stopped.")
 
-    async def _handle_rate_limit(self, session: aiohttp.ClientSession, url: str) -> aiohttp.ClientResponse:
+    async def _handle_rate_limit(
+        self, session: aiohttp.ClientSession, url: str, extra_headers: Optional[Dict[str, str]] = None
+    ) -> aiohttp.ClientResponse:
         """
         Performs an HTTP GET inside a concurrency-limited section, with
-        built-in rate-limit checking for 429 responses from Teachable.
+        built-in rate-limit checking for 429 responses from Teachable and
+        jittered exponential backoff for 504s and transient connection errors.
+        Backoff sleeps happen outside the semaphore; a 429 pauses all callers.
+        Circuit breaker bookkeeping happens in the session's trace hooks.
         """
         retries = 0
         while retries < self.max_retries:
             if self._stop:
                 raise asyncio.CancelledError("API client stopped.")
+            # A 429 pauses every caller until the rate limit window resets
+            pause = self._resume_at - time.monotonic()
+            if pause > 0:
+                await self._sleep(pause)
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"API circuit breaker open, not fetching {url}")
             
             async with self.api_calls_semaphore:  # <--- concurrency-limited
                 # Only log retries, not initial requests
@@ -326,30 +534,27 @@ class TeachableAPIClient:
                     logger.debug(f"Retrying URL: {url} (Retry {retries})")
                 
                 try:
-                    response = await session.get(url, headers=self.headers)
+                    # Auth headers live on the session; only conditional headers vary per call
+                    response = await session.get(url, headers=extra_headers)
                     
                     # Check status code first
+                    if response.status not in RETRYABLE_STATUSES:
+                        # For any other status, return the response to be handled by caller
+                        return response
+
+                    # Read headers but don't consume body; close this response since we'll retry
+                    try:
+                        delay = self._retry_delay(response, url, retries)
+                    finally:
+                        response.release()
                     if response.status == 429:
-                        # Read headers but don't consume body for 429
-                        logger.debug(f"Received 429 response. Rate limit headers: {response.headers}")
-                        reset_time_str = response.headers.get("RateLimit-Reset", "")
-                        
-                        # Close this response since we'll retry
-                        await response.release()
-                        
-                        if reset_time_str.isdigit():
-                            delay = int(reset_time_str)
-                            logger.warning(f"Rate limit reached. Retrying after {delay} seconds (RateLimit-Reset).")
-                        else:
-                            delay = self.initial_delay * (self.delay_factor ** retries)
-                            logger.warning(f"Rate limit reached; no valid 'RateLimit-Reset'. Retrying in {delay}s.")
-                        await asyncio.sleep(delay)
-                        retries += 1
-                        continue
-                    
-                    # For any other status, return the response to be handled by caller
-                    return response
+                        # The limit applies to the whole API key, so the wait is shared (see loop top)
+                        self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                        delay = 0
                     
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    delay = backoff_delay(retries)
+                    logger.warning(f"Transient error when fetching {url}: {e!r}. Retrying in {delay:.1f}s.")
                 except aiohttp.ClientError as e:
                     logger.error(f"HTTP error when fetching {url}: {e}")
                     raise
@@ -357,53 +562,223 @@ class TeachableAPIClient:
                     logger.error(f"Unexpected error when fetching {url}: {e}")
                     raise
 
+            # Back off outside the semaphore so a retrying request doesn't hold a slot others could use
+            if delay > 0:
+                await self._sleep(delay)
+            retries += 1
+
         logger.error(f"Max retries exceeded. Could not fetch {url}")
         raise aiohttp.ClientError(f"Max retries exceeded for {url}.")
 
+    @asynccontextmanager
+    async def _request(
+        self, url: str, extra_headers: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """
+        GETs an API URL with the retry handling of _handle_rate_limit and yields the
+        response, releasing it however the block is left.
+        """
+        response = await self._handle_rate_limit(self.session, url, extra_headers)
+        try:
+            yield response
+        finally:
+            response.release()
+
+    def _retry_delay(self, response: aiohttp.ClientResponse, url: str, retries: int) -> float:
+        """
+        Picks how long to wait before retrying a 429/503/504 response,
+        preferring the server's own Retry-After or RateLimit-Reset hint.
+        """
+        logger.debug(f"Received {response.status} response. Rate limit headers: {response.headers}")
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            logger.warning(f"Server returned {response.status}. Retrying after {retry_after:.1f} seconds (Retry-After).")
+            return retry_after
+
+        delay = backoff_delay(retries, self.initial_delay, self.delay_factor, cap=300)
+        if response.status == 429:
+            reset_time_str = response.headers.get("RateLimit-Reset", "")
+            if reset_time_str.isdigit():
+                logger.warning(f"Rate limit reached. Retrying after {reset_time_str} seconds (RateLimit-Reset).")
+                return int(reset_time_str)
+            logger.warning(f"Rate limit reached; no valid 'RateLimit-Reset'. Retrying in {delay:.1f}s.")
+        elif response.status == 503:
+            logger.warning(f"Service unavailable (503) without Retry-After. Retrying in {delay:.1f}s.")
+        else:
+            logger.warning(f"Received 504 Gateway Timeout for {url}. Retrying in {delay:.1f}s.")
+        return delay
+
+    async def _on_request_end(self, session, trace_ctx, params: aiohttp.TraceRequestEndParams) -> None:
+        """Trace hook: record a finished request with the circuit breaker"""
+        response = params.response
+        if response.status in (429, 503) and parse_retry_after(response.headers.get("Retry-After")) is not None:
+            self.breaker.record_success()  # The API is up and told us when to come back
+        elif response.status >= 500:
+            self.breaker.record_failure()
+        elif response.status != 429:
+            # 4xx means the API is up; a bare 429 says nothing about its health
+            self.breaker.record_success()
+
+    async def _on_request_exception(self, session, trace_ctx, params: aiohttp.TraceRequestExceptionParams) -> None:
+        """Trace hook: count connection errors and timeouts against the circuit breaker"""
+        if isinstance(params.exception, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+            self.breaker.record_failure()
+
     async def __aenter__(self) -> "TeachableAPIClient":
         # Provide explicit timeouts for connect, read, total, etc.
         timeout = aiohttp.ClientTimeout(total=60, connect=10, sock_connect=10, sock_read=30)
-        self.session = aiohttp.ClientSession(timeout=timeout)
+        # One pooled, keep-alive connector for the whole run: no DNS/TCP/TLS setup per API call or retry.
+        # Sized to the API semaphore so the pool never opens connections the semaphore won't use.
+        connector = aiohttp.TCPConnector(
+            limit=API_MAX_CONCURRENT_CALLS,
+            limit_per_host=API_MAX_CONCURRENT_CALLS,
+            ttl_dns_cache=300,
+            keepalive_timeout=75,
+            # No explicit resolver: aiohttp's default uses aiodns (aiohttp[speedups]) when it is
+            # installed and falls back to its threaded resolver otherwise
+        )
+        # Feed every request outcome to the circuit breaker from one place
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_request_exception.append(self._on_request_exception)
+        # The API authenticates with the apiKey header; a no-op jar avoids tracking cookies for the whole run
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            timeout=timeout,
+            connector=connector,
+            trace_configs=[trace_config],
+            cookie_jar=aiohttp.DummyCookieJar(),
+        )
+        if self.cache_path and self.cache_path.exists():
+            try:
+                loaded = orjson.loads(self.cache_path.read_bytes())
+                # Older cache files may still hold user responses; keep only what is cacheable now
+                cacheable = [(url, entry) for url, entry in loaded.items() if self._is_cacheable(url)]
+                self._response_cache = dict(cacheable[-API_CACHE_MAX_ENTRIES:])
+                logger.debug(f"Loaded {len(self._response_cache)} cached API responses from {self.cache_path}")
+            except (OSError, orjson.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable API cache {self.cache_path}: {e}")
         return self
 
     async def __aexit__(self, exc_type, exc, tb) -> None:
+        # Shared requests may be sleeping out a retry that nobody is waiting for any more
+        self.stop()
+        for pending in list(self._inflight.values()):
+            pending.cancel()
         await self.session.close()
+        # Also rewritten when empty, so pruned entries from an older cache file don't linger on disk
+        if self.cache_path and (self._response_cache or self.cache_path.exists()):
+            try:
+                self.cache_path.write_bytes(orjson.dumps(self._response_cache))
+            except OSError as e:
+                logger.warning(f"Could not save API cache {self.cache_path}: {e}")
 
     async def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
         """
         Makes an async GET request to the API.
+        Concurrent requests for the same URL share a single HTTP call.
         """
         if self._stop:
             raise asyncio.CancelledError("API client stopped.")
 
         url = f"{self.base_url}{endpoint}"
         if params:
-            query_str = "&".join(f"{key}={value}" for key, value in params.items())
-            url = f"{url}?{query_str}"
+            # yarl escapes the query values; the string form keys the caches and in-flight map
+            url = str(URL(url).with_query(params))
+
+        # Known-bad URLs (404, 403, ...) fail fast for a while instead of costing another round trip
+        negative = self._negative_cache.get(url)
+        if negative is not None:
+            expires_at, error = negative
+            if time.monotonic() < expires_at:
+                raise error
+            del self._negative_cache[url]
+
+        pending = self._inflight.get(url)
+        if pending is None:
+            pending = asyncio.ensure_future(self._fetch_body(url))
+            self._inflight[url] = pending
+            pending.add_done_callback(functools.partial(self._forget_inflight, url))
+        # Shielded so one cancelled caller does not cancel the request for the others
+        body = await asyncio.shield(pending)
+
+        try:
+            # Every caller parses its own copy, callers mutate the returned data
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Failed to parse JSON from response. URL={url}, Error={e}")
+            logger.error(f"Raw response text: {body[:1000]!r}...")  # First 1000 chars
+            raise
+
+    def _is_cacheable(self, url: str) -> bool:
+        """
+        Only course content (/courses/{id} and its lectures, videos and attachments) is cached.
+        User endpoints carry names, emails and enrollments and never go to disk.
+        """
+        parts = url.removeprefix(self.base_url).partition("?")[0].strip("/").split("/")
+        return len(parts) >= 2 and parts[0] == "courses" and parts[1].isdigit()
+
+    def _remember_response(self, url: str, entry: Dict[str, Optional[str]]) -> None:
+        """Stores a cache entry as the most recently used one, evicting the oldest past the cap"""
+        self._response_cache.pop(url, None)
+        self._response_cache[url] = entry
+        while len(self._response_cache) > API_CACHE_MAX_ENTRIES:
+            del self._response_cache[next(iter(self._response_cache))]
+
+    def _forget_inflight(self, url: str, task: asyncio.Future) -> None:
+        """Done callback: drop a finished request from the in-flight map"""
+        self._inflight.pop(url, None)
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every caller has gone away
+
+    async def _fetch_body(self, url: str) -> bytes | str:
+        """
+        Fetches the raw JSON body of an API URL, revalidating cached responses.
+        """
+        # Revalidate responses we have seen before; the server answers 304 if they are unchanged
+        cacheable = self._is_cacheable(url)
+        cached = self._response_cache.get(url) if cacheable else None
+        conditional_headers = None
+        if cached:
+            conditional_headers = {}
+            if cached.get("etag"):
+                conditional_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                conditional_headers["If-Modified-Since"] = cached["last_modified"]
 
         try:
             # Get response but keep it in the context manager
-            async with await self._handle_rate_limit(self.session, url) as response:
+            async with self._request(url, conditional_headers) as response:
+                if response.status == 304 and cached:
+                    self._remember_response(url, cached)
+                    return cached["body"]
+
                 if not response.status == 200:
                     logger.debug(f"Response status: {response.status}")
                     # logger.debug(f"Response headers: {response.headers}")
                 
                 if response.status >= 400:
-                    error_text = await response.text()
+                    # Only the start of an error body is worth logging; don't buffer all of it
+                    error_text = (await response.content.read(2048)).decode(errors="replace")
                     logger.error(f"Error response for URL {url}: {response.status} - {error_text}")
-                    response.raise_for_status()
-
-                try:
-                    # Use response.json() directly which handles gzip and chunked encoding
-                    data = await response.json()
-                    # logger.debug(f"Successfully parsed JSON response for {url}")
-                    return data
-                except Exception as e:
-                    # If JSON parsing fails, try to get the raw text for debugging
-                    text = await response.text()
-                    logger.error(f"Failed to parse JSON from response. URL={url}, Error={e}")
-                    logger.error(f"Raw response text: {text[:1000]}...")  # First 1000 chars
-                    raise
+                    try:
+                        response.raise_for_status()
+                    except aiohttp.ClientResponseError as e:
+                        if response.status < 500:
+                            self._negative_cache[url] = (time.monotonic() + NEGATIVE_CACHE_TTL, e)
+                        raise
+
+                # read() handles gzip and chunked encoding; the body is parsed with orjson by get()
+                body = await response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                if cacheable and (etag or last_modified):
+                    self._remember_response(url, {
+                        "etag": etag,
+                        "last_modified": last_modified,
+                        "body": body.decode("utf-8"),
+                    })
+                return body
 
         except aiohttp.ClientError as e:
             logger.error(f"HTTP error for {url}: {str(e)}")
@@ -414,49 +789,50 @@ class TeachableAPIClient:
 
     async def get_all_courses(self) -> List[Dict[str, Any]]:
         """
-        Asynchronously fetches all courses, paging through until all results are gathered.
+        Asynchronously fetches all courses. The first page tells us the page count,
+        the remaining pages are then fetched concurrently (bounded by the API semaphore).
         """
         logger.info("Fetching all courses...")
-        all_courses = []
-        page = 1
         per_page = 20
 
-        while not self._stop:
-            logger.info(f"Fetching courses page {page}...")
-            params = {"page": page, "per": per_page}
-            try:
-                data = await self.get("/courses", params=params)
-            except aiohttp.ClientResponseError as e:
-                logger.error(f"ClientResponseError while fetching courses: status={e.status}, message={e.message}, url={e.request_info}")
-                break
-            except aiohttp.ClientConnectionError as e:
-                logger.error(f"ClientConnectionError while fetching courses: {e}")
-                break
-            except aiohttp.ClientPayloadError as e:
-                logger.error(f"ClientPayloadError while reading the response: {e}")
-                break
-            except aiohttp.ClientError as e:
-                logger.error(f"Other aiohttp ClientError fetching courses: {e}")
-                break
-            except asyncio.CancelledError:
-                logger.warning("User interrupted fetching courses. Stopping.")
-                break
-            except Exception as e:
-                logger.error(f"Unexpected error fetching courses page {page}: {e}")
-                break
-
-            courses = data["courses"]
-            all_courses.extend(courses)
+        data = await self._get_courses_page(1, per_page)
+        if data is None:
+            return []
+        all_courses = data["courses"]
 
-            meta = data.get("meta", {})
-            total_pages = meta.get("number_of_pages", 1)
-            current_page = meta.get("page", page)
-            if current_page >= total_pages:
-                break
-            page += 1
+        total_pages = data.get("meta", {}).get("number_of_pages", 1)
+        if total_pages > 1 and not self._stop:
+            pages = await asyncio.gather(
+                *(self._get_courses_page(page, per_page) for page in range(2, total_pages + 1))
+            )
+            for data in pages:
+                if data is not None:
+                    all_courses.extend(data["courses"])
 
         return all_courses
 
+    async def _get_courses_page(self, page: int, per_page: int) -> Optional[Dict[str, Any]]:
+        """
+        Fetches one page of the course list, returning None if it could not be fetched.
+        """
+        logger.info(f"Fetching courses page {page}...")
+        params = {"page": page, "per": per_page}
+        try:
+            return await self.get("/courses", params=params)
+        except aiohttp.ClientResponseError as e:
+            logger.error(f"ClientResponseError while fetching courses: status={e.status}, message={e.message}, url={e.request_info}")
+        except aiohttp.ClientConnectionError as e:
+            logger.error(f"ClientConnectionError while fetching courses: {e}")
+        except aiohttp.ClientPayloadError as e:
+            logger.error(f"ClientPayloadError while reading the response: {e}")
+        except aiohttp.ClientError as e:
+            logger.error(f"Other aiohttp ClientError fetching courses: {e}")
+        except asyncio.CancelledError:
+            logger.warning("User interrupted fetching courses. Stopping.")
+        except Exception as e:
+            logger.error(f"Unexpected error fetching courses page {page}: {e}")
+        return None
+
     async def get_course(self, course_id: int) -> Dict[str, Any]:
         """
         Fetches a specific course by ID.
@@ -471,40 +847,62 @@ class TeachableAPIClient:
         course_data = await self.get_course(course_id)
         course_data["sections"] = course_data.pop("lecture_sections")
 
-        for section in course_data["sections"]:
-            section["lectures_detailed"] = []
-            for lecture in section["lectures"]:
-                try:
-                    lecture_details = await self.get_lecture(course_id, lecture["id"])
-                    lecture_details["section_id"] = section["id"]
-                    lecture_details["section_name"] = section["name"]
-                    lecture_details["section_position"] = section["position"]
-                    section["lectures_detailed"].append(lecture_details)
-                except aiohttp.ClientError as e:
-                    logger.error(
-                        f"Error fetching details for lecture ID {lecture['id']} in course ID {course_id}: {e}"
-                    )
+        # Schedule every lecture at once; the API semaphore, not this loop, limits concurrency
+        async with asyncio.TaskGroup() as group:
+            lecture_tasks = [
+                (section, [group.create_task(self._get_section_lecture(course_id, section, lecture["id"]))
+                           for lecture in section["lectures"]])
+                for section in course_data["sections"]
+            ]
+        for section, tasks in lecture_tasks:
+            section["lectures_detailed"] = [task.result() for task in tasks if task.result() is not None]
         return course_data
 
+    async def _get_section_lecture(
+        self, course_id: int, section: Dict[str, Any], lecture_id: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Fetches one lecture of a section and tags it with the section details, or None on error.
+        """
+        try:
+            lecture_details = await self.get_lecture(course_id, lecture_id)
+        except aiohttp.ClientError as e:
+            logger.error(
+                f"Error fetching details for lecture ID {lecture_id} in course ID {course_id}: {e}"
+            )
+            return None
+        lecture_details["section_id"] = section["id"]
+        lecture_details["section_name"] = section["name"]
+        lecture_details["section_position"] = section["position"]
+        return lecture_details
+
     async def get_lecture(self, course_id: int, lecture_id: int) -> Dict[str, Any]:
         """
         Fetches a specific lecture, including video details if present.
         """
         lecture_data = await self.get(f"/courses/{course_id}/lectures/{lecture_id}")
         attachments = lecture_data["lecture"].get("attachments", [])
-        for attachment in attachments:
-            if attachment["kind"] == "video":
-                try:
-                    video_data = await self.get_attachment_details(
-                        course_id, lecture_id, attachment["id"], "video"
-                    )
-                    attachment["url_thumbnail"] = video_data["video"].get("url_thumbnail", "")
-                    attachment["media_duration"] = video_data["video"].get("media_duration", 0)
-                except aiohttp.ClientError as e:
-                    logger.error(f"Error fetching video details for attachment ID {attachment['id']} in lecture ID {lecture_id}: {e}")
+        videos = [attachment for attachment in attachments if attachment["kind"] == "video"]
+        if videos:
+            async with asyncio.TaskGroup() as group:
+                for attachment in videos:
+                    group.create_task(self._add_video_details(course_id, lecture_id, attachment))
 
         return lecture_data["lecture"]
 
+    async def _add_video_details(self, course_id: int, lecture_id: int, attachment: Dict[str, Any]) -> None:
+        """
+        Adds thumbnail and duration from the video endpoint to a video attachment.
+        """
+        try:
+            video_data = await self.get_attachment_details(
+                course_id, lecture_id, attachment["id"], "video"
+            )
+            attachment["url_thumbnail"] = video_data["video"].get("url_thumbnail", "")
+            attachment["media_duration"] = video_data["video"].get("media_duration", 0)
+        except aiohttp.ClientError as e:
+            logger.error(f"Error fetching video details for attachment ID {attachment['id']} in lecture ID {lecture_id}: {e}")
+
     async def get_attachment_details(
         self, course_id: int, lecture_id: int, attachment_id: int, attachment_kind: str
     ) -> Dict[str, Any]:
@@ -515,20 +913,40 @@ class TeachableAPIClient:
             return await self.get(f"/courses/{course_id}/lectures/{lecture_id}/videos/{attachment_id}")
         return await self.get(f"/courses/{course_id}/lectures/{lecture_id}/attachments/{attachment_id}")
 
-async def rename_if_needed(directory: pathlib.Path, new_filename: str, attachment_id: str) -> None:
+def index_attachment_files(directory: pathlib.Path) -> Dict[str, List[str]]:
+    """
+    Lists a course directory once, mapping every attachment ID that appears as an
+    '_<id>_' part of a file name to those file names. Ignores .partial files.
+    """
+    index: Dict[str, List[str]] = defaultdict(list)
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith('.partial') or not entry.is_file():
+                continue
+            # Parts between two underscores, i.e. the names that contain f"_{part}_"
+            for part in set(entry.name.split("_")[1:-1]):
+                if part.isdigit():
+                    index[part].append(entry.name)
+    return index
+
+async def rename_if_needed(
+    directory: pathlib.Path,
+    new_filename: str,
+    attachment_id: str,
+    file_index: Optional[Dict[str, List[str]]] = None,
+) -> None:
     """
     Checks if files with the attachment ID exist, and if so:
     1. If multiple files exist, keeps only the newest one with same size
     2. Renames the kept file to the new filename
     Ignores .partial files as they are temporary download files.
+    Pass a file_index from index_attachment_files() to avoid listing the directory
+    for every attachment; it is kept up to date with the removals and renames done here.
     """
+    if file_index is None:
+        file_index = index_attachment_files(directory)
     # Find all files containing the attachment ID, excluding .partial files
-    matching_files = [
-        file for file in directory.iterdir()
-        if (file.is_file() and 
-            f"_{attachment_id}_" in file.name and 
-            not file.name.endswith('.partial'))
-    ]
+    matching_files = [directory / name for name in file_index.get(attachment_id, ())]
 
     if len(matching_files) > 1:
         # Group files by size
@@ -550,17 +968,13 @@ async def rename_if_needed(directory: pathlib.Path, new_filename: str, attachmen
                 for file in files[1:]:
                     try:
                         file.unlink()
+                        update_indexed_file(file_index, file.name)
                         logger.info(f"Removed duplicate file: {file}")
                     except OSError as e:
                         logger.error(f"Error removing duplicate file {file}: {e}")
 
         # After cleanup, get the remaining file
-        matching_files = [
-            file for file in directory.iterdir()
-            if (file.is_file() and 
-                f"_{attachment_id}_" in file.name and 
-                not file.name.endswith('.partial'))
-        ]
+        matching_files = [directory / name for name in file_index.get(attachment_id, ())]
 
     # Proceed with renaming if we have a file
     if matching_files:
@@ -569,35 +983,194 @@ async def rename_if_needed(directory: pathlib.Path, new_filename: str, attachmen
         if existing_file != new_path:
             try:
                 existing_file.rename(new_path)
+                update_indexed_file(file_index, existing_file.name, new_path.name)
                 logger.info(f"Renamed existing file:")
                 logger.info(f"  From: {existing_file}")
                 logger.info(f"  To:   {new_path}")
             except OSError as e:
                 logger.error(f"Error renaming file: {e}")
 
+def update_indexed_file(file_index: Dict[str, List[str]], old_name: str, new_name: Optional[str] = None) -> None:
+    """Records a removed (new_name=None) or renamed file in an index_attachment_files() index"""
+    for part in set(old_name.split("_")[1:-1]):
+        names = file_index.get(part)
+        if names and old_name in names:
+            names.remove(old_name)
+    if new_name is not None:
+        for part in set(new_name.split("_")[1:-1]):
+            if part.isdigit():
+                file_index.setdefault(part, []).append(new_name)
+
+def open_download_fd(output_path: pathlib.Path, start_pos: int = 0) -> int:
+    """
+    Opens a download target as a raw fd positioned at start_pos, for both fresh and resumed downloads.
+    Anything past start_pos is discarded. Raw fd writes skip the BufferedWriter copy of every chunk.
+    """
+    fd = os.open(output_path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        os.ftruncate(fd, start_pos)
+        os.lseek(fd, start_pos, os.SEEK_SET)
+        if hasattr(os, "posix_fadvise"):
+            # Streaming write; let the kernel tune readahead/writeback accordingly
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    except OSError:
+        os.close(fd)
+        raise
+    return fd
+
+def preallocate_fd(fd: int, start_pos: int, file_size: int) -> None:
+    """
+    Reserves the rest of a download of known size up front: fewer extents, and a full disk
+    fails with ENOSPC before any data is fetched. Blocking (filesystems without native
+    fallocate get zero-filled by libc); run it in a thread. A no-op where posix_fallocate is missing.
+    """
+    if file_size > start_pos and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, start_pos, file_size - start_pos)
+        except OSError as e:
+            # Only a full disk should stop the download; filesystems without fallocate
+            # support (EOPNOTSUPP/EINVAL on some network or FUSE mounts) just skip it
+            if e.errno == errno.ENOSPC:
+                raise
+            logger.debug(f"Skipping preallocation: {e}")
+
+def finish_download_fd(fd: int, size: int) -> None:
+    """
+    Finalizes a download fd: trims it to the bytes received, optionally fsyncs it
+    and drops it from the page cache. Blocking; run it in a thread.
+    """
+    # Drop any preallocated tail if the body came up short, so the size check sees it
+    os.ftruncate(fd, size)
+    # Only force data to disk when explicitly requested
+    if FSYNC_DOWNLOADS:
+        os.fsync(fd)
+    if hasattr(os, "posix_fadvise"):
+        # We never re-read downloads, so keep them from crowding the page cache
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+def promote_partial_file(
+    file_path: pathlib.Path, partial_path: pathlib.Path, expected_size: int, actual_size: int
+) -> bool:
+    """
+    Verifies a finished .partial download against the expected size and renames it into place.
+    An expected_size of 0 means the server sent no Content-Length, so there is nothing to verify.
+    """
+    if expected_size and actual_size != expected_size:
+        logger.error(
+            f"File size mismatch for {format_filename_for_log(file_path.name)}. "
+            f"Expected: {expected_size:,}, Got: {actual_size:,}"
+        )
+        return False
+
+    # Atomically replaces any older copy, so there is never a moment without a file
+    partial_path.replace(file_path)
+    return True
+
+async def download_file_ranges(
+    session: aiohttp.ClientSession,
+    url: str,
+    output_path: pathlib.Path,
+    file_size: int,
+    parts: int = RANGE_SPLIT_PARTS,
+) -> Optional[int]:
+    """
+    Downloads a file as several concurrent HTTP Range requests, each written in place with os.pwrite.
+
+    Returns:
+        The size of the written file, or None if the server did not answer every
+        slice with 206 Partial Content (the caller then falls back to one stream).
+        The file is emptied whenever this does not complete, since its slices can't be resumed.
+    """
+    slice_size = -(-file_size // parts)
+    ranges = [(start, min(start + slice_size, file_size) - 1) for start in range(0, file_size, slice_size)]
+
+    fd = open_download_fd(output_path)
+    completed = False
+    try:
+        await run_to_completion(preallocate_fd, fd, 0, file_size)
+
+        async def fetch_range(start: int, end: int) -> bool:
+            async with session.get(url, headers={"Range": f"bytes={start}-{end}"}) as response:
+                if response.status != 206:
+                    return False
+                offset = start
+                pending: List[bytes] = []
+                pending_size = 0
+                async for chunk, _ in response.content.iter_chunks():
+                    pending.append(chunk)
+                    pending_size += len(chunk)
+                    if pending_size >= DOWNLOAD_READ_BUFSIZE:
+                        offset += await flush_chunks(fd, pending, offset)
+                        pending_size = 0
+                if pending:
+                    offset += await flush_chunks(fd, pending, offset)
+                return offset == end + 1
+
+        # TaskGroup cancels the sibling slices if one fails, before the fd is closed
+        async with asyncio.TaskGroup() as group:
+            slices = [group.create_task(fetch_range(start, end)) for start, end in ranges]
+        if not all(task.result() for task in slices):
+            return None
+
+        await run_to_completion(finish_download_fd, fd, file_size)
+        completed = True
+        return file_size
+    finally:
+        try:
+            if not completed:
+                # Preallocated with holes between the slices; a later run must not resume from it
+                os.ftruncate(fd, 0)
+        finally:
+            os.close(fd)
+
+def new_download_session(connector: Optional[aiohttp.BaseConnector] = None) -> aiohttp.ClientSession:
+    """
+    Creates a ClientSession configured for attachment downloads.
+    """
+    # No overall cap (large videos legitimately take long); stalled connections are cut by sock_read
+    timeout = aiohttp.ClientTimeout(total=None, connect=30, sock_connect=30, sock_read=120)
+    return aiohttp.ClientSession(
+        timeout=timeout,
+        read_bufsize=DOWNLOAD_READ_BUFSIZE,
+        connector=connector,
+        cookie_jar=aiohttp.DummyCookieJar(),  # Attachment URLs are pre-signed, cookies are never needed
+    )
+
 async def download_file(
     url: str, 
     file_path: pathlib.Path, 
-    semaphore: asyncio.Semaphore,
+    semaphore: AsyncContextManager[Any],
     course_info: Optional[Dict[str, Any]] = None,
-    verify: bool = False
+    session: Optional[aiohttp.ClientSession] = None
 ) -> bool:
     """
-    Asynchronously downloads a file using aiohttp with a bounded semaphore for concurrency.
+    Asynchronously downloads a file using aiohttp with a bounded concurrency limiter.
     Downloads to a .partial file first, then renames on successful completion.
     For small files (<1MB), always downloads fresh to avoid partial file issues.
+    An existing file that already has the server-reported size is kept as is; otherwise it is
+    only replaced once a complete new copy is in the .partial, never removed on failure.
     
     Args:
         url: The URL to download from
         file_path: Where to save the file
-        semaphore: Concurrency limiter
+        semaphore: Concurrency limiter (a semaphore or any async context manager)
         course_info: Optional dict containing course/lecture context
-        verify: Whether to verify existing files with HEAD request
+        session: Optional shared download session (see new_download_session); a private one is used otherwise
     """
     if not url:
         logger.error("Skipping download: Missing URL.")
         return False
 
+    # Formatted once; the name shows up in nearly every log line below
+    display_name = format_filename_for_log(file_path.name)
+
+    def admin_urls_for_log() -> str:
+        """Admin URLs as extra lines for an error message ('' if unavailable), only built on error paths"""
+        attachment_id = course_info.get('attachment_id') if course_info else None
+        attachment_kind = course_info.get('attachment_kind') if course_info else None
+        admin_urls = format_admin_urls(course_info, attachment_id, attachment_kind, url)
+        return f"\n{admin_urls}" if admin_urls else ""
+
     # Create partial download path
     partial_path = file_path.with_suffix(file_path.suffix + '.partial')
     SMALL_FILE_THRESHOLD = 1024 * 1024  # 1MB threshold for small files
@@ -605,142 +1178,203 @@ async def download_file(
     start_pos = 0
     file_size = 0
     supports_resume = False
+    # Set once this call starts writing file_path itself; only then may a failure remove it
+    wrote_file_path = False
 
     async with semaphore:
         try:
-            timeout = aiohttp.ClientTimeout(total=3600, connect=60, sock_read=60)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                # Do HEAD request to get file size
-                async with session.head(url, headers={"Accept-Ranges": "bytes"}) as head_response:
-                    if head_response.status == 403:
+            async with nullcontext(session) if session is not None else new_download_session() as session:
+                # One ranged GET tells us the size and whether ranges work; no separate HEAD round trip.
+                # An existing file is probed from its end (a 416 then proves it complete without any body),
+                # a leftover .partial is resumed a safety margin before its end.
+                existing_size = local_file_size(file_path)
+                range_start = existing_size or 0
+                if not existing_size and (partial_size := local_file_size(partial_path)):
+                    range_start = max(partial_size - RESUME_SAFETY_MARGIN, 0)
+                response = await session.get(url, headers={"Range": f"bytes={range_start}-"})
+                if response.status == 416:
+                    content_range = response.headers.get("Content-Range", "")
+                    response.release()
+                    if existing_size and content_range == f"bytes */{existing_size}":
+                        logger.info(f"File verified complete: {display_name}")
+                        return True
+                    # Size changed, or a server that refuses any range on an empty file; ask for the plain body
+                    response = await session.get(url)
+                elif response.status == 206 and range_start:
+                    content_range = response.headers.get("Content-Range", "")
+                    total = content_range.rpartition("/")[2]
+                    # A .partial as long as the whole file is a preallocation that never got truncated to its
+                    # real progress (the process was killed): its end may be zeros, so it can't be resumed
+                    if (
+                        not existing_size and content_range.startswith(f"bytes {range_start}-")
+                        and total.isdigit() and partial_size < int(total)
+                    ):
+                        start_pos = range_start
+                        logger.info(f"Resuming {display_name} from {start_pos:,} bytes")
+                    else:
+                        # The server has more than our 'complete' file: fetch it again from the start
+                        response.close()
+                        response = await session.get(url, headers={"Range": "bytes=0-"})
+                async with AsyncExitStack() as responses:
+                    await responses.enter_async_context(response)
+                    if response.status == 403:
                         # Handle 403 Forbidden error
-                        attachment_id = course_info.get('attachment_id') if course_info else None
-                        attachment_kind = course_info.get('attachment_kind')
-                        admin_urls = format_admin_urls(course_info, attachment_id, attachment_kind, url)
+                        admin_urls = admin_urls_for_log()
                         
-                        logger.error(f"Access forbidden (403) for: {format_filename_for_log(file_path.name)}")
-                        for url_line in admin_urls.split('\n'):
-                            logger.error(url_line)
+                        logger.error(f"Access forbidden (403) for: {display_name}{admin_urls}")
+                        return False
+                    elif response.status >= 400:
+                        admin_urls = admin_urls_for_log()
                         
-                        if file_path.exists():
-                            file_path.unlink()
+                        logger.error(f"Download failed [{response.status}]: {display_name}{admin_urls}")
                         return False
-                    
-                    supports_resume = "Accept-Ranges" in head_response.headers
-                    file_size = int(head_response.headers.get("Content-Length", 0))
+
+                    # 206 means the range was honoured; Content-Range then carries the full size ("bytes 0-99/100")
+                    supports_resume = response.status == 206 or response.headers.get("Accept-Ranges") == "bytes"
+                    total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                    if response.status == 206 and total.isdigit():
+                        file_size = int(total)
+                    else:
+                        file_size = (response.content_length or 0) + (start_pos if response.status == 206 else 0)
                     logger.debug(
-                        f"HEAD request for {format_filename_for_log(file_path.name)}: "
+                        f"GET {response.status} for {display_name}: "
                         f"size={file_size:,} bytes, supports_resume={supports_resume}"
                     )
-                    
+
+                    # Now that the size is known, a complete file needs no body at all
+                    if file_size and existing_size is not None:
+                        actual_size = existing_size
+                        if actual_size == file_size:
+                            response.close()
+                            logger.info(f"File verified complete: {display_name}")
+                            return True
+                        logger.info(
+                            f"Size mismatch, redownloading {display_name} - "
+                            f"expected: {file_size:,}, actual: {actual_size:,}"
+                        )
+
                     # For small files, always start fresh
-                    if file_size < SMALL_FILE_THRESHOLD:
-                        if partial_path.exists():
-                            partial_path.unlink()
-                        # If final file exists and we're not verifying, skip download
-                        if file_path.exists() and not verify:
-                            actual_size = file_path.stat().st_size
-                            if actual_size == file_size:
-                                logger.info(f"Small file verified complete: {format_filename_for_log(file_path.name)}")
-                                return True
-                            # For small files, if size mismatch, remove and redownload
-                            logger.info(f"Size mismatch for small file, redownloading: {format_filename_for_log(file_path.name)}")
-                            file_path.unlink()
-                
-                # Start the actual download
-                headers = {"Range": f"bytes={start_pos}-"} if start_pos > 0 else {}
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 403:
-                        # Handle 403 Forbidden error
-                        attachment_id = course_info.get('attachment_id') if course_info else None
-                        attachment_kind = course_info.get('attachment_kind')
-                        admin_urls = format_admin_urls(course_info, attachment_id, attachment_kind, url)
-                        
-                        logger.error(f"Access forbidden (403) for: {format_filename_for_log(file_path.name)}")
-                        for url_line in admin_urls.split('\n'):
-                            logger.error(url_line)
-                        
-                        if file_path.exists():
-                            file_path.unlink()
-                        return False
-                    elif response.status >= 400:
-                        error_text = await response.text()
-                        attachment_id = course_info.get('attachment_id') if course_info else None
-                        attachment_kind = course_info.get('attachment_kind')
-                        admin_urls = format_admin_urls(course_info, attachment_id, attachment_kind, url)
-                        
-                        logger.error(f"Download failed [{response.status}]: {format_filename_for_log(file_path.name)}")
-                        for url_line in admin_urls.split('\n'):
-                            logger.error(url_line)
-                        
-                        if file_path.exists():
-                            file_path.unlink()
-                        return False
+                    if file_size < SMALL_FILE_THRESHOLD and partial_path.exists():
+                        partial_path.unlink()
+
+                    # Large files from servers that honour ranges are fetched as parallel slices
+                    if (
+                        file_size >= RANGE_SPLIT_THRESHOLD and response.status == 206
+                        and not start_pos and hasattr(os, "pwrite")
+                    ):
+                        response.close()  # Don't drain the full body we just asked for
+                        logger.info(
+                            f"Downloading {display_name} "
+                            f"({file_size / (1024*1024):.2f} MB) in {RANGE_SPLIT_PARTS} ranges"
+                        )
+                        actual_size = await download_file_ranges(session, url, partial_path, file_size)
+                        if actual_size is not None:
+                            if not promote_partial_file(file_path, partial_path, file_size, actual_size):
+                                return False
+                            logger.info(
+                                f"Completed: {display_name} - "
+                                f"{course_info.get('course_name', 'Unknown')} - "
+                                f"Module: {course_info.get('module_name', 'Unknown')}"
+                            )
+                            return True
+                        logger.warning(
+                            f"Server did not honour every Range request, falling back to a single stream: {display_name}"
+                        )
+                        response = await responses.enter_async_context(await session.get(url))
+                        if response.status != 200:
+                            logger.error(f"Download failed [{response.status}]: {display_name}{admin_urls_for_log()}")
+                            return False
+
+                    if response.content_length is None:
+                        logger.debug(
+                            f"No Content-Length for {display_name} "
+                            f"(Transfer-Encoding: {response.headers.get('Transfer-Encoding', 'none')})"
+                        )
 
-                    # For small files, download directly to final location
-                    output_path = file_path if file_size < SMALL_FILE_THRESHOLD else partial_path
+                    # New small files go straight to their final location; anything that replaces an
+                    # existing file goes through the .partial, so the old file survives a failed transfer
+                    if file_size < SMALL_FILE_THRESHOLD and existing_size is None:
+                        output_path = file_path
+                    else:
+                        output_path = partial_path
                     
                     try:
-                        with open(output_path, "wb") as out_file:
-                            chunk_size = 8 * 1024 * 1024  # 8MB instead of 16MB
-                            downloaded = 0
+                        wrote_file_path = output_path == file_path
+                        fd = open_download_fd(output_path, start_pos)
+                        downloaded = 0
+                        finished = False
+                        try:
+                            # Only the .partial is preallocated: a small file is written in place, and
+                            # an interrupted one must not be left at its full size with a zeroed tail
+                            if output_path == partial_path:
+                                await run_to_completion(preallocate_fd, fd, start_pos, file_size)
                             
                             logger.info(
-                                f"Downloading {format_filename_for_log(file_path.name)} "
+                                f"Downloading {display_name} "
                                 f"({file_size / (1024*1024):.2f} MB)"
                             )
                             last_log_time = time.time()
 
-                            async for chunk in response.content.iter_chunked(chunk_size):
+                            # Take chunks as the socket delivers them and write them out in
+                            # read-buffer sized batches from a worker thread, so disk stalls
+                            # don't block the other downloads and API calls
+                            pending: List[bytes] = []
+                            pending_size = 0
+                            async for chunk, _ in response.content.iter_chunks():
                                 if not chunk:
                                     break
-                                out_file.write(chunk)
-                                downloaded += len(chunk)
+                                pending.append(chunk)
+                                pending_size += len(chunk)
+                                if pending_size >= DOWNLOAD_READ_BUFSIZE:
+                                    downloaded += await flush_chunks(fd, pending)
+                                    pending_size = 0
 
                                 # Log progress every 10 seconds or every chunk if <10s
                                 now = time.time()
                                 if now - last_log_time >= 10:
                                     if file_size:
                                         progress = (downloaded / file_size) * 100
-                                        logger.debug(f"Progress: {progress:.1f}% for {format_filename_for_log(file_path.name)}")
+                                        logger.debug(f"Progress: {progress:.1f}% for {display_name}")
                                     last_log_time = now
-
-                            # Ensure all data is written to disk
-                            out_file.flush()
-                            os.fsync(out_file.fileno())
-
-                        # For larger files, verify and rename partial file
-                        if file_size >= SMALL_FILE_THRESHOLD:
-                            actual_size = partial_path.stat().st_size
-                            if actual_size != file_size:
-                                logger.error(
-                                    f"File size mismatch for {format_filename_for_log(file_path.name)}. "
-                                    f"Expected: {file_size:,}, Got: {actual_size:,}"
-                                )
+                            if pending:
+                                downloaded += await flush_chunks(fd, pending)
+
+                            # write_chunks only returns once every byte is written, so the count is the file size
+                            actual_size = start_pos + downloaded
+                            await run_to_completion(finish_download_fd, fd, actual_size)
+                            finished = True
+                        finally:
+                            try:
+                                if not finished:
+                                    # Cancelled or failed: drop the preallocated tail so the file only holds
+                                    # bytes really received, and a later run resumes from its true end
+                                    os.ftruncate(fd, start_pos + downloaded)
+                            finally:
+                                os.close(fd)
+
+                        # Verify the .partial and rename it over any existing file
+                        if output_path == partial_path:
+                            if not promote_partial_file(file_path, partial_path, file_size, actual_size):
                                 return False
 
-                            # Rename partial file to final filename
-                            if file_path.exists():
-                                file_path.unlink()
-                            partial_path.rename(file_path)
-
                         logger.info(
-                            f"Completed: {format_filename_for_log(file_path.name)} - "
+                            f"Completed: {display_name} - "
                             f"{course_info.get('course_name', 'Unknown')} - "
                             f"Module: {course_info.get('module_name', 'Unknown')}"
                         )
                         return True
 
                     except OSError as e:
-                        logger.error(f"OS Error while writing file {format_filename_for_log(file_path.name)}: {e}")
+                        logger.error(f"OS Error while writing file {display_name}: {e}")
+                        if wrote_file_path:
+                            file_path.unlink(missing_ok=True)
                         return False
 
         except Exception as e:
-            logger.error(f"Error downloading {format_filename_for_log(file_path.name)}: {e}")
-            if file_path.exists():
-                file_path.unlink()
-            # if partial_path.exists():
-            #     partial_path.unlink()
+            # A failed probe or transfer leaves an already downloaded file alone; the .partial is kept for resuming
+            logger.error(f"Error downloading {display_name}: {e}")
+            if wrote_file_path:
+                file_path.unlink(missing_ok=True)
             return False
 
 @dataclass
@@ -753,7 +1387,7 @@ class DownloadTask:
     attachment_id: int
     attachment_name: str
     attachment_kind: str  # Add attachment type
-    file_size: Optional[int] = None
+    file_size: Optional[int] = None  # Expected size in bytes, if known before downloading
     course_name: Optional[str] = None
     module_id: Optional[int] = None
     module_name: Optional[str] = None
@@ -788,29 +1422,28 @@ class DownloadFailure:
 class DownloadManager:
     """Centralized download manager for handling concurrent downloads"""
     def __init__(self, max_concurrent: int = MAX_CONCURRENT_DOWNLOADS):
-        self.queue: Queue[DownloadTask] = Queue()
         self.max_concurrent = max_concurrent
         self.current_concurrent = max_concurrent
-        self.semaphore = asyncio.Semaphore(self.current_concurrent)
-        self.active_downloads: Dict[int, asyncio.Task] = {}
+        # Counter + condition instead of a semaphore so the limit can change at runtime
+        self._slot_cond = asyncio.Condition()
+        # Bounds scheduled-but-unfinished downloads so producers walking the course tree block
+        # instead of piling up tasks
+        self._backlog = asyncio.Semaphore(max_concurrent * 4)
+        self._download_tasks: Set[asyncio.Task] = set()  # One task per scheduled download
+        self._scheduled_paths: Set[pathlib.Path] = set()  # Every target ever scheduled, so duplicates are dropped
+        self._session: Optional[aiohttp.ClientSession] = None  # Shared by all downloads, see _get_session()
         self._stop = False
-        self._consumers: List[asyncio.Task] = []
-        self._started = False
         self.failed_downloads: Set[int] = set()  # Track actual failed downloads
         self.completed_downloads: Set[int] = set()  # Track successful downloads
-        self._active_count = 0
+        self._active_count = 0  # Downloads currently holding a concurrency slot
         self.failures: List[DownloadFailure] = []
         self.consecutive_successes: int = 0  # track consecutive successful downloads
 
     def get_status(self) -> str:
         """Returns current download manager status"""
-        self.active_downloads = {
-            id_: task for id_, task in self.active_downloads.items() 
-            if not task.done()
-        }
         status = (
-            f"Active downloads: {len(self.active_downloads)}, "
-            f"Queue size: {self.queue.qsize()}"
+            f"Active downloads: {self._active_count}, "
+            f"Queue size: {max(len(self._download_tasks) - self._active_count, 0)}"
         )
         
         if self.completed_downloads:
@@ -825,195 +1458,181 @@ class DownloadManager:
     def stop(self) -> None:
         """Signal the download manager to stop processing new downloads"""
         self._stop = True
-        # Cancel all active downloads
-        for task in self.active_downloads.values():
+        # Cancel all scheduled and active downloads
+        for task in self._download_tasks:
             if not task.done():
                 task.cancel()
-        # Cancel all consumers
-        for consumer in self._consumers:
-            if not consumer.done():
-                consumer.cancel()
-
-    async def ensure_consumers_running(self, num_consumers: int = 3) -> None:
-        """Ensures consumers are running, starts them if not"""
-        if not self._started:
-            await self.start_consumers(num_consumers)
-            self._started = True
 
     async def add_task(self, task: DownloadTask) -> None:
-        """Add a new download task to the queue and ensure consumers are running"""
+        """Schedule a new download; waits while too many downloads are still outstanding"""
         if self._stop:
             return
-        # Ensure consumers are running before adding task
-        await self.ensure_consumers_running()
-        await self.queue.put(task)
+        # Skip if this task previously failed
+        if task.attachment_id in self.failed_downloads:
+            logger.debug(f"Skipping previously failed download: {task.attachment_name}")
+            return
+        # Two downloads into the same .partial would corrupt it; the first one wins
+        if task.file_path in self._scheduled_paths:
+            logger.debug(f"Skipping duplicate download: {task.attachment_name}")
+            return
+        self._scheduled_paths.add(task.file_path)
+        try:
+            await self._backlog.acquire()
+        except asyncio.CancelledError:
+            self._scheduled_paths.discard(task.file_path)
+            raise
+        download = asyncio.create_task(self._run_download(task))
+        self._download_tasks.add(download)
+        download.add_done_callback(self._download_done)
+
+    def _download_done(self, download: asyncio.Task) -> None:
+        """Done callback for a scheduled download: frees its backlog slot"""
+        self._download_tasks.discard(download)
+        self._backlog.release()
+        if not self._download_tasks and not self._stop:
+            status = self.get_status()
+            if self.failed_downloads:
+                logger.error(f"All downloads completed with some failures - {status}")
+            else:
+                logger.info(f"All downloads completed successfully - {status}")
 
-    async def start_consumers(self, num_consumers: int = 3) -> None:
-        """Start consumer tasks to process downloads"""
-        self._consumers = [
-            asyncio.create_task(self._consumer_worker(f"consumer-{i}"))
-            for i in range(num_consumers)
-        ]
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the long-lived session shared by all downloads, creating it on first use.
+        Pooled keep-alive connections and cached DNS skip a handshake and lookup per file.
+        """
+        if self._session is None or self._session.closed:
+            # Range downloads open several connections per file to the same host
+            limit = self.max_concurrent * RANGE_SPLIT_PARTS
+            connector = aiohttp.TCPConnector(
+                limit=limit,
+                limit_per_host=limit,
+                ttl_dns_cache=300,
+                keepalive_timeout=75,
+            )
+            self._session = new_download_session(connector)
+        return self._session
+
+    async def close(self) -> None:
+        """Close the shared download session"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @asynccontextmanager
+    async def _download_slot(self) -> AsyncIterator[None]:
+        """Hold one of the current_concurrent download slots for the duration of the block"""
+        async with self._slot_cond:
+            await self._slot_cond.wait_for(lambda: self._active_count < self.current_concurrent)
+            self._active_count += 1
+        try:
+            yield
+        finally:
+            async with self._slot_cond:
+                self._active_count -= 1
+                self._slot_cond.notify(1)
 
     def reduce_concurrency_to_one(self) -> None:
         """
         Temporarily reduce concurrency to 1.
-        Resets the current semaphore to a single slot.
+        Downloads already running finish; new ones wait until a slot is free.
         """
         self.current_concurrent = 1
-        self.semaphore = asyncio.Semaphore(self.current_concurrent)
         self.consecutive_successes = 0
         logger.warning("Reduced concurrency to 1 due to cancelled download.")
 
-    def restore_max_concurrency_if_ready(self) -> None:
+    async def restore_max_concurrency_if_ready(self) -> None:
         """
         If we have at least 2 consecutive successes, restore concurrency to the original max.
         """
         if self.current_concurrent < self.max_concurrent and self.consecutive_successes >= 2:
             self.current_concurrent = self.max_concurrent
-            self.semaphore = asyncio.Semaphore(self.current_concurrent)
+            # Wake up waiters that can now take one of the extra slots
+            async with self._slot_cond:
+                self._slot_cond.notify_all()
             logger.warning(f"Restored concurrency to max ({self.max_concurrent}).")
 
-    async def _consumer_worker(self, worker_id: str) -> None:
-        """Worker that processes download tasks from the queue"""
-        while not self._stop:
-            task = None
+    async def _run_download(self, task: DownloadTask) -> None:
+        """Runs a single download task, retrying it if the download itself gets cancelled"""
+        # Add retry logic for cancelled downloads
+        max_retries = 3
+        retry_count = 0
+        while retry_count < max_retries:
             try:
-                task = await self.queue.get()
-                if task is None:
-                    self.queue.task_done()
-                    break
+                success = await asyncio.create_task(self._process_download(task))
+                if success:
+                    self.completed_downloads.add(task.attachment_id)
+                    self.consecutive_successes += 1  # increment on success
+                    # Try restoring concurrency if we had reduced it
+                    await self.restore_max_concurrency_if_ready()
 
-                # Skip if this task previously failed
-                if task.attachment_id in self.failed_downloads:
-                    logger.debug(f"Skipping previously failed download: {task.attachment_name}")
-                    self.queue.task_done()
-                    continue
+                    logger.debug(
+                        f"Download completed successfully: {task.attachment_name} - {self.get_status()}"
+                    )
+                else:
+                    self.failed_downloads.add(task.attachment_id)
+                    logger.debug(
+                        f"Download failed: {str(task.file_path)[11:]} {task.attachment_name} - {self.get_status()}"
+                    )
+                break
 
-                # Add retry logic for cancelled downloads
-                max_retries = 3
-                retry_count = 0
-                while retry_count < max_retries:
-                    try:
-                        download_task = asyncio.create_task(
-                            self._process_download(task)
-                        )
-                        self.active_downloads[task.attachment_id] = download_task
+            except asyncio.CancelledError:
+                # Only retry when the download was cancelled, not this task (stop() or shutdown)
+                if self._stop or asyncio.current_task().cancelling():
+                    raise
 
-                        success = await download_task
-                        if success:
-                            self.completed_downloads.add(task.attachment_id)
-                            self.consecutive_successes += 1  # increment on success
-                            # Try restoring concurrency if we had reduced it
-                            self.restore_max_concurrency_if_ready()
+                # reduce concurrency and reset success count
+                self.reduce_concurrency_to_one()
 
-                            logger.debug(
-                                f"Download completed successfully: {task.attachment_name} - {self.get_status()}"
-                            )
-                            break
-                        else:
-                            self.failed_downloads.add(task.attachment_id)
-                            logger.debug(
-                                f"Download failed: {str(task.file_path)[11:]} {task.attachment_name} - {self.get_status()}"
-                            )
-                            break
-
-                    except asyncio.CancelledError:
-                        # reduce concurrency and reset success count
-                        self.reduce_concurrency_to_one()
-
-                        retry_count += 1
-                        wait_time = 5 * (2 ** retry_count)
-                        admin_urls = format_admin_urls(
-                            course_info={
-                                'course_id': task.course_id,
-                                'course_name': task.course_name,
-                                'module_id': task.module_id,
-                                'module_name': task.module_name,
-                                'lecture_id': task.lecture_id,
-                                'lecture_name': task.lecture_name,
-                                'attachment_id': task.attachment_id,
-                                'attachment_kind': task.attachment_kind
-                            },
-                            attachment_id=task.attachment_id,
-                            attachment_kind=task.attachment_kind,
-                            url=task.url
-                        )
-                        if retry_count < max_retries:
-                            logger.warning(
-                                f"Download cancelled for {str(task.file_path)[11:]} {task.attachment_name} - "
-                                f"Retrying in {wait_time}s (Attempt {retry_count}/{max_retries})"
-                            )
-                            for url_line in admin_urls.split('\n'):
-                                logger.debug(url_line)
-                            try:
-                                await asyncio.sleep(wait_time)
-                            except asyncio.CancelledError:
-                                logger.warning("Retry wait interrupted, proceeding with next attempt immediately")
-                            continue
-                        else:
-                            logger.error(
-                                f"Download permanently cancelled for {str(task.file_path)[11:]} {task.attachment_name} "
-                                f"after {max_retries} attempts"
-                            )
-                            for url_line in admin_urls.split('\n'):
-                                logger.error(url_line)
-                            self.failed_downloads.add(task.attachment_id)
-                            break
-
-                    except Exception as e:
-                        logger.error(f"Error downloading {task.attachment_name}: {e} - {self.get_status()}")
-                        self.failed_downloads.add(task.attachment_id)
-                        break
-
-                self.queue.task_done()
-                status = self.get_status()
-                logger.debug(f"Task completed - {status}")
-
-                if self.queue.empty() and not self.active_downloads:
-                    if self.failed_downloads:
-                        logger.error(f"All downloads completed with some failures - {status}")
-                    else:
-                        logger.info(f"All downloads completed successfully - {status}")
+                retry_count += 1
+                wait_time = 5 * (2 ** retry_count)
+                admin_urls = format_admin_urls(
+                    course_info=task.to_context_dict(),
+                    attachment_id=task.attachment_id,
+                    attachment_kind=task.attachment_kind,
+                    url=task.url
+                )
+                if retry_count < max_retries:
+                    logger.warning(
+                        f"Download cancelled for {str(task.file_path)[11:]} {task.attachment_name} - "
+                        f"Retrying in {wait_time}s (Attempt {retry_count}/{max_retries})"
+                    )
+                    if admin_urls:
+                        logger.debug(admin_urls)
+                    await asyncio.sleep(wait_time)
+                    continue
+                else:
+                    logger.error(
+                        f"Download permanently cancelled for {str(task.file_path)[11:]} {task.attachment_name} "
+                        f"after {max_retries} attempts" + (f"\n{admin_urls}" if admin_urls else "")
+                    )
+                    self.failed_downloads.add(task.attachment_id)
+                    break
 
-            except asyncio.CancelledError:
-                if task:
-                    self.queue.task_done()
-                break
             except Exception as e:
-                if task:
-                    self.queue.task_done()
-                logger.error(f"Error in consumer {worker_id}: {e} - {self.get_status()}")
+                logger.error(f"Error downloading {task.attachment_name}: {e} - {self.get_status()}")
+                self.failed_downloads.add(task.attachment_id)
+                break
+
+        logger.debug(f"Task completed - {self.get_status()}")
 
     async def _process_download(self, task: DownloadTask) -> bool:
         """Process a single download task"""
         try:
             logger.debug(f"Processing download: {str(task.file_path)}")
-            # Get actual file size from server first
-            async with aiohttp.ClientSession() as session:
-                async with session.head(task.url) as response:
-                    if 'Content-Length' in response.headers:
-                        task.file_size = int(response.headers['Content-Length'])
-                        logger.debug(f"Server reports size {task.file_size:,} bytes for attachment {task.attachment_id}")
-
-            # Now check existing file with correct size
-            if os.path.exists(task.file_path):
-                file_size = os.path.getsize(task.file_path)
-                if task.file_size and file_size == task.file_size:
-                    logger.info(f"Skipping attachment {task.attachment_id} - file already exists with correct size")
-                    self.completed_downloads.add(task.attachment_id)
-                    return True
-                elif task.file_size:  # Only log mismatch if we have an expected size
-                    logger.warning(f"Size mismatch for attachment {task.attachment_id} - "
-                                 f"expected: {task.file_size:,}, actual: {file_size:,}")
+            # If the API already told us the size, a complete file needs no network round-trip at all
+            if task.file_size and local_file_size(task.file_path) == task.file_size:
+                logger.info(f"Skipping attachment {task.attachment_id} - file already exists with correct size")
+                self.completed_downloads.add(task.attachment_id)
+                return True
 
-            # Actually perform the download
+            # Otherwise download_file compares any existing file against the size from its GET response
             success = await download_file(
                 url=task.url,
                 file_path=task.file_path,
-                semaphore=self.semaphore,
+                semaphore=self._download_slot(),
                 course_info=task.to_context_dict(),
-                verify=True
+                session=self._get_session()
             )
 
             if success:
@@ -1033,7 +1652,7 @@ class DownloadManager:
                     course_name=task.course_name or "Unknown",
                     attachment_id=task.attachment_id,
                     filename=task.file_path.name,
-                    actual_size=os.path.getsize(task.file_path) if os.path.exists(task.file_path) else None,
+                    actual_size=local_file_size(task.file_path),
                     expected_size=task.file_size,
                     view_lecture_url=view_lecture_url,
                     manual_video_url=manual_video_url,
@@ -1055,7 +1674,7 @@ class DownloadManager:
                 course_name=task.course_name or "Unknown",
                 attachment_id=task.attachment_id,
                 filename=task.file_path.name,
-                actual_size=os.path.getsize(task.file_path) if os.path.exists(task.file_path) else None,
+                actual_size=local_file_size(task.file_path),
                 expected_size=task.file_size,
                 view_lecture_url=view_lecture_url,
                 manual_video_url=manual_video_url,
@@ -1100,34 +1719,12 @@ class DownloadManager:
 
     async def wait_for_downloads(self) -> None:
         """
-        Wait for all queued downloads to complete, including retries.
-        Modified to keep waiting while new tasks are spawned.
+        Wait for all scheduled downloads to complete, including retries.
+        Keeps waiting while new downloads are scheduled by still-running producers.
         """
-        while True:
-            # Wait for queue to be empty
-            queue_empty_task = asyncio.create_task(self.queue.join())
-            try:
-                await asyncio.wait_for(queue_empty_task, timeout=30)
-            except asyncio.TimeoutError:
-                logger.warning(f"Timeout waiting for queue tasks - {self.get_status()}")
-                # If not done, we can reduce concurrency or keep waiting
-                continue
-
-            # Check for active downloads
-            active_tasks = [t for t in self.active_downloads.values() if not t.done()]
-            if active_tasks:
-                logger.warning(f"Waiting for {len(active_tasks)} active downloads to finish...")
-                # Attempt to gather them with a small timeout
-                try:
-                    await asyncio.wait_for(asyncio.gather(*active_tasks, return_exceptions=True), timeout=30)
-                except asyncio.TimeoutError:
-                    logger.warning("Timeout waiting for active downloads - possibly retry logic. Continuing to wait.")
-                continue
+        while self._download_tasks:
+            await asyncio.gather(*self._download_tasks, return_exceptions=True)
 
-            # If we get here, queue is empty and no active tasks remain
-            break
-
-        self.active_downloads.clear()
         if self.failed_downloads:
             logger.info(f"Download manager completed with some failures - {self.get_status()}")
         else:
@@ -1145,9 +1742,6 @@ async def process_course(
     csv_only: bool = False
 ) -> None:
     """Modified to support csv-only mode"""
-    # Initialize download_tasks set at the start
-    download_tasks = set()  # Track download tasks for this course
-    
     try:
         course_data = await api_client.get_course(course_id)
         course_name = course_data["name"]
@@ -1156,15 +1750,13 @@ async def process_course(
         logger.error(f"Error fetching course {course_id}: {e}")
         return
 
-    course_dirname = f"{course_id} - {safe_filename(course_name)}"
-    course_dir = output_dir / course_dirname
+    safe_course_name = safe_filename(course_name)
+    course_dir = output_dir / f"{course_id} - {safe_course_name}"
     course_dir.mkdir(parents=True, exist_ok=True)
 
     # Check for rename only if we have the existing name
     if existing_course_name and existing_course_name != course_name:
         rename_course_directory(output_dir, course_id, existing_course_name, course_name)
-        course_dirname = f"{course_id} - {safe_filename(course_name)}"
-        course_dir = output_dir / course_dirname
 
     # Download course cover image if available and not in csv-only mode
     if not csv_only and (image_url := course_data.get("image_url")):
@@ -1173,7 +1765,7 @@ async def process_course(
         if not ext or ext.lower() not in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
             ext = '.jpg'  # Default extension if none found or not recognized
             
-        cover_filename = f"{course_id} - {safe_filename(course_name)} - Cover{ext}"
+        cover_filename = f"{course_id} - {safe_course_name} - Cover{ext}"
         cover_path = course_dir / cover_filename
         
         if not cover_path.exists():
@@ -1192,8 +1784,7 @@ async def process_course(
                 module_name=None,
                 lecture_name=None
             )
-            task = asyncio.create_task(download_manager.add_task(download_task))
-            download_tasks.add(task)
+            await download_manager.add_task(download_task)
             logger.info(f"Queued download of course cover image: {cover_filename}")
 
     # Backup existing CSV
@@ -1209,17 +1800,22 @@ async def process_course(
         return
 
     processed_data = []
+    # One directory listing per course instead of one per attachment
+    file_index = index_attachment_files(course_dir)
+    # Collected during the walk and scheduled largest-first afterwards
+    download_tasks: List[DownloadTask] = []
 
     async def queue_download(attachment: Dict[str, Any], 
                            file_path: pathlib.Path,
                            lecture: Dict[str, Any]) -> None:
-        """Helper to queue a download and track its task"""
+        """Helper to build a download task, renaming any existing file first"""
         if url := attachment.get("url"):
             # First check if we need to rename any existing files
             await rename_if_needed(
                 file_path.parent,
                 file_path.name,
-                str(attachment["id"])
+                str(attachment["id"]),
+                file_index
             )
             
             download_task = DownloadTask(
@@ -1230,14 +1826,13 @@ async def process_course(
                 attachment_id=attachment["id"],
                 attachment_name=attachment.get("name", ""),
                 attachment_kind=attachment.get("kind", ""),  # Include attachment type
-                file_size=attachment.get("media_duration"),
+                file_size=attachment.get("file_size") or None,  # API reports 0 for videos
                 course_name=course_name,
                 module_id=lecture["section_id"],
                 module_name=lecture["name"],
                 lecture_name=lecture["name"]
             )
-            task = asyncio.create_task(download_manager.add_task(download_task))
-            download_tasks.add(task)
+            download_tasks.append(download_task)
 
     try:
         for section in course_content["sections"]:
@@ -1269,7 +1864,8 @@ async def process_course(
                         await rename_if_needed(
                             file_path.parent,
                             file_path.name,
-                            str(attachment["id"])
+                            str(attachment["id"]),
+                            file_index
                         )
                         
                         # Save the HTML content
@@ -1286,12 +1882,12 @@ async def process_course(
                         await rename_if_needed(
                             file_path.parent,
                             file_path.name,
-                            str(attachment["id"])
+                            str(attachment["id"]),
+                            file_index
                         )
                         
                         # Save the quiz content
-                        with open(file_path, "w", encoding="utf-8") as f:
-                            json.dump(attachment["quiz"], f, indent=2)
+                        file_path.write_bytes(orjson.dumps(attachment["quiz"], option=orjson.OPT_INDENT_2))
                         logger.info(f"      Saved quiz content to {filename}")
 
                     # Continue with regular attachment processing
@@ -1316,23 +1912,20 @@ async def process_course(
                 )
                 processed_data.extend(processed_lecture_data)
 
-        # Save processed data to CSV
-        course_data_path = course_dir / "course_data.csv"
-        save_data_to_csv(processed_data, course_data_path)
+        # Save processed data to CSV off the event loop, while the downloads below are being scheduled;
+        # add_task can wait a long time for backlog room and the CSV doesn't depend on it
+        csv_saved = asyncio.create_task(asyncio.to_thread(save_data_to_csv, processed_data, course_data_path))
+        try:
+            # Longest first, so a big video never ends up running alone after everything else finished.
+            # The API reports no size for videos, which are nearly always the largest files.
+            download_tasks.sort(key=lambda task: (task.attachment_kind != "video", -(task.file_size or 0)))
+            for download_task in download_tasks:
+                # Awaited directly so a full queue applies backpressure
+                await download_manager.add_task(download_task)
+        finally:
+            await csv_saved
         logger.info(f"Course data saved to {course_data_path}")
 
-        # Wait for downloads only if not in csv-only mode
-        if not csv_only and download_tasks:
-            logger.info(f"Waiting for {len(download_tasks)} downloads to complete...")
-            try:
-                await asyncio.wait_for(
-                    asyncio.gather(*download_tasks, return_exceptions=True),
-                    timeout=30
-                )
-            except asyncio.TimeoutError:
-                logger.warning("Timeout waiting for downloads to complete; proceeding.")
-            logger.info("All downloads completed for this course")
-
     except Exception as e:
         logger.error(f"Error processing course {course_id}: {e}")
         raise
@@ -1348,19 +1941,26 @@ async def process_courses(
     # Get optional args with defaults
     module_id = getattr(args, 'module_id', None)
     lecture_id = getattr(args, 'lecture_id', None)
-    
-    for course_id in course_ids:
-        await process_course(
-            api_client=api_client,
-            course_id=course_id,
-            module_id=module_id,
-            lecture_id=lecture_id,
-            output_dir=args.output,
-            valid_types=args.types,
-            download_manager=download_manager,
-            existing_course_name=course_names.get(course_id),
-            csv_only=args.csv_only
-        )
+    course_semaphore = asyncio.Semaphore(MAX_CONCURRENT_COURSES)
+
+    async def process_one(course_id: int) -> None:
+        async with course_semaphore:
+            await process_course(
+                api_client=api_client,
+                course_id=course_id,
+                module_id=module_id,
+                lecture_id=lecture_id,
+                output_dir=args.output,
+                valid_types=args.types,
+                download_manager=download_manager,
+                existing_course_name=course_names.get(course_id),
+                csv_only=args.csv_only
+            )
+
+    # Overlap the API walks of several courses; downloads share the download_manager limit
+    async with asyncio.TaskGroup() as group:
+        for course_id in course_ids:
+            group.create_task(process_one(course_id))
     
     # Only wait for downloads if not in csv-only mode
     if not args.csv_only:
@@ -1408,7 +2008,7 @@ async def get_user_details(api_client: TeachableAPIClient, user_id: int) -> Opti
         
     except Exception as e:
         logger.error(f"Error fetching user {user_id}: {str(e)}")
-        logger.debug(f"Error details for user {user_id}: {traceback.format_exc()}")
+        logger.opt(exception=True).debug(f"Error details for user {user_id}")
         return None
 
 async def process_user(
@@ -1448,7 +2048,7 @@ async def process_user(
             
     except Exception as e:
         logger.error(f"Failed to process user {user_id}: {str(e)}")
-        logger.debug(f"Error details for user {user_id}: {traceback.format_exc()}")
+        logger.opt(exception=True).debug(f"Error details for user {user_id}")
         raise  # Re-raise to be caught by semaphore wrapper
 
 def load_existing_users(users_file: pathlib.Path) -> Dict[int, datetime]:
@@ -1483,7 +2083,7 @@ def load_existing_users(users_file: pathlib.Path) -> Dict[int, datetime]:
                     continue
     except Exception as e:
         logger.error(f"Error loading existing users: {str(e)}")
-        logger.debug(f"Error details: {traceback.format_exc()}")
+        logger.opt(exception=True).debug("Error details")
 
     return existing_users
 
@@ -1506,7 +2106,7 @@ async def get_all_users(api_client: TeachableAPIClient, output_dir: pathlib.Path
 
     # Create semaphores for API calls
     page_semaphore = asyncio.Semaphore(1)  # One page at a time
-    user_semaphore = asyncio.Semaphore(API_MAX_CONCURRENT_CALLS - 1)  # Leave one slot for page fetching
+    user_semaphore = asyncio.Semaphore(max(1, API_MAX_CONCURRENT_CALLS - 1))  # Leave one slot for page fetching
     
     page = 1
     per_page = 100
@@ -1666,11 +2266,11 @@ async def main() -> None:
     download_manager = DownloadManager(MAX_CONCURRENT_DOWNLOADS)
     
     try:
-        # Start the download manager consumers only if we're not in csv-only mode
-        if not (hasattr(args, 'csv_only') and args.csv_only):
-            await download_manager.start_consumers()
-
-        async with TeachableAPIClient(api_key=os.environ.get("TEACHABLE_API_KEY", "")) as api_client:
+        output_dir = getattr(args, "output", None)
+        api_cache_path = output_dir / API_CACHE_FILENAME if output_dir and output_dir.is_dir() else None
+        async with TeachableAPIClient(
+            api_key=os.environ.get("TEACHABLE_API_KEY", ""), cache_path=api_cache_path
+        ) as api_client:
             if args.operation == "test-snippet":
                 # This precisely replicates the "requests" snippet:
                 url = "/courses"
@@ -1692,7 +2292,7 @@ async def main() -> None:
                     # Fetch and save all courses
                     all_courses = await api_client.get_all_courses()
                     file_path = args.output / "all_courses_data.csv"
-                    save_data_to_csv(all_courses, file_path)
+                    await asyncio.to_thread(save_data_to_csv, all_courses, file_path)
                     logger.info(f"All courses saved to {file_path}")
 
                     if not args.csv_only:
@@ -1718,7 +2318,7 @@ async def main() -> None:
                     logger.info("Fetching all courses...")
                     all_courses = await api_client.get_all_courses()
                     file_path = args.output / "all_courses_data.csv"
-                    save_data_to_csv(all_courses, file_path)
+                    await asyncio.to_thread(save_data_to_csv, all_courses, file_path)
                     logger.info(f"All courses saved to {file_path}")
                                         
                     course_names = {c["id"]: c["name"] for c in all_courses}
@@ -1749,73 +2349,15 @@ async def main() -> None:
             await download_manager.wait_for_downloads()
             if download_manager.failures:
                 download_manager.print_failure_summary()
+        await download_manager.close()
         logger.info("Cleanup complete.")
 
 # Updated entry point with proper signal handling for Windows
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt. Shutting down gracefully...")
-
-async def handle_gateway_timeout(response: aiohttp.ClientResponse, retry_count: int = 3) -> None:
-    """
-    Handle 504 Gateway Timeout errors by implementing a waiting period.
-    
-    Args:
-        response: The response object from the failed request
-        retry_count: Number of retries before giving up (default: 3)
-    """
-    if response.status == 504:
-        wait_time = 300  # 5 minutes in seconds
-        logger.warning(f"Received 504 Gateway Timeout. Waiting {wait_time} seconds before retry. Attempts remaining: {retry_count}")
-        await asyncio.sleep(wait_time)
-        return True
-    return False
-
-async def get(url: str, headers: dict = None, retry_count: int = 3) -> dict:
-    """
-    Make a GET request to the API with retry logic for various error conditions.
-    
-    Args:
-        url: The URL to make the request to
-        headers: Request headers
-        retry_count: Number of retries before giving up
-    
-    Returns:
-        dict: The JSON response from the API
-    """
-    async with aiohttp.ClientSession() as session:
-        while retry_count > 0:
-            try:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    
-                    # Handle rate limiting
-                    if response.status == 429:
-                        await handle_rate_limit(response)
-                        retry_count -= 1
-                        continue
-                        
-                    # Handle gateway timeout
-                    if response.status == 504:
-                        should_retry = await handle_gateway_timeout(response, retry_count)
-                        if should_retry:
-                            retry_count -= 1
-                            continue
-                    
-                    # Log other errors
-                    error_text = await response.text()
-                    logger.error(f"Error response for URL {url}: {response.status} - {error_text}")
-                    raise ApiError(f"API request failed with status {response.status}")
-                    
-            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-                if retry_count <= 1:
-                    logger.error(f"Failed to fetch {url} after all retries: {str(e)}")
-                    raise
-                logger.warning(f"Request failed, retrying... ({retry_count-1} attempts remaining): {str(e)}")
-                retry_count -= 1
-                await asyncio.sleep(5)  # Short delay before retry
-                
-    raise ApiError("Maximum retries exceeded")
\ No newline at end of file
@@ -14,12 +14,18 @@ Requirements:
 
 import argparse
 import csv
-import json
+import functools
+import itertools
+import logging
 import sys
-from datetime import datetime, timezone
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime, timezone
 from pathlib import Path
 
-from loguru import logger
+import orjson
+
+# Stdlib logging; configured in main()
+logger = logging.getLogger(__name__)
 
 
 def parse_timestamp(timestamp: str) -> str:
@@ -32,42 +38,71 @@ def parse_timestamp(timestamp: str) -> str:
     Returns:
         A formatted timestamp string.
     """
-    # Replace 'Z' with '+00:00' to make it ISO 8601 compliant if necessary.
-    if timestamp.endswith("Z"):
-        timestamp = timestamp.replace("Z", "+00:00")
     try:
-        dt = datetime.fromisoformat(timestamp)
-        return dt.strftime("%Y-%m-%d %H:%M:%S")
+        # fromisoformat accepts a trailing 'Z' since Python 3.11; the first 19 characters
+        # of isoformat(" ", "seconds") are exactly 'YYYY-MM-DD HH:MM:SS', without a strftime pass
+        return datetime.fromisoformat(timestamp).isoformat(" ", "seconds")[:19]
     except Exception as e:
         logger.error(f"Error parsing timestamp '{timestamp}': {e}")
         return ""
 
 
-def load_users(input_file: Path) -> list[dict]:
+@functools.lru_cache(maxsize=4096)
+def is_iso_date(day: str) -> bool:
+    """
+    Checks that a string is a real calendar date in 'YYYY-MM-DD' form.
+    Cached, since many enrollments share the same day.
+    """
+    if len(day) != 10 or day[4] != "-" or day[7] != "-":
+        return False
+    try:
+        date.fromisoformat(day)
+    except ValueError:
+        return False
+    return True
+
+
+def is_utc_timestamp(timestamp: str) -> bool:
+    """Checks for the 'YYYY-MM-DDTHH:MM:SS...Z' shape Teachable uses, with a valid date part."""
+    return (
+        len(timestamp) >= 20
+        and timestamp.endswith("Z")
+        and timestamp[10] == "T"
+        and timestamp[13] == timestamp[16] == ":"
+        and is_iso_date(timestamp[:10])
+    )
+
+
+def iter_users(input_file: Path) -> Iterator[dict]:
     """
-    Load users from the provided NDJSON file.
+    Stream users from the provided NDJSON file, one parsed line at a time.
     
     Args:
         input_file: Path to the NDJSON file.
         
-    Returns:
-        A list of user dictionaries.
+    Yields:
+        User dictionaries.
     """
-    users = []
-    with input_file.open("r", encoding="utf-8") as f:
+    with input_file.open("rb") as f:
         for line_num, line in enumerate(f, 1):
-            line = line.strip()
-            if not line:
+            # orjson ignores surrounding whitespace, so the line needs no strip() copy
+            if line.isspace():
                 continue
             try:
-                user = json.loads(line)
-                users.append(user)
-            except json.JSONDecodeError as e:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError as e:
                 logger.error(f"Skipping invalid JSON on line {line_num}: {e}")
-    return users
 
 
-def filter_students(users: list[dict], course_id: int) -> list[dict]:
+def find_enrollment(user: dict, course_id: int) -> dict | None:
+    """
+    Returns the user's enrollment record for course_id, or None if not enrolled.
+    Only the first matching enrollment counts.
+    """
+    return next((course for course in user.get("courses", ()) if course.get("course_id") == course_id), None)
+
+
+def filter_students(users: Iterable[dict], course_id: int) -> list[dict]:
     """
     Filters for students with role "student" that are enrolled in the provided course_id.
     
@@ -77,7 +112,7 @@ def filter_students(users: list[dict], course_id: int) -> list[dict]:
       - enrollment date (from the course enrollment data)
     
     Args:
-        users: List of user dictionaries from the NDJSON file.
+        users: User dictionaries from the NDJSON file.
         course_id: Course ID to filter for.
         
     Returns:
@@ -88,25 +123,27 @@ def filter_students(users: list[dict], course_id: int) -> list[dict]:
         if user.get("role") != "student":
             continue
 
-        courses = user.get("courses", [])
-        for course in courses:
-            if course.get("course_id") == course_id:
-                full_name = user.get("name", "")
-                if full_name and len(full_name.split()) == 2:
-                    first_name, last_name = full_name.split()
-                else:
-                    first_name, last_name = "", full_name
-
-                record = {
-                    "email": user.get("email", ""),
-                    "first_name": first_name,
-                    "last_name": last_name,
-                    "courses": "",  # To be set later from the mentor_tool_courses parameter.
-                    "order_billing_type": "single",
-                    "purchase_date": parse_timestamp(course.get("enrolled_at", ""))
-                }
-                filtered_records.append(record)
-                break  # Only take one matching enrollment per student.
+        course = find_enrollment(user, course_id)
+        if course is None:
+            continue
+
+        full_name = user.get("name", "")
+        # Only a plain "First Last" name is split; anything else goes to last_name unchanged
+        name_parts = full_name.split(maxsplit=2) if full_name else ()
+        if len(name_parts) == 2:
+            first_name, last_name = name_parts
+        else:
+            first_name, last_name = "", full_name
+
+        record = {
+            "email": user.get("email", ""),
+            "first_name": first_name,
+            "last_name": last_name,
+            "courses": "",  # write_csv fills this from the mentor_tool_courses parameter.
+            "order_billing_type": "single",
+            "purchase_date": parse_timestamp(course.get("enrolled_at", ""))
+        }
+        filtered_records.append(record)
     return filtered_records
 
 
@@ -122,10 +159,6 @@ def write_csv(records: list[dict], output_path: Path, mentor_tool_courses: str)
         output_path: Path to the output CSV file.
         mentor_tool_courses: Value to populate in the CSV 'courses' field.
     """
-    # Set the courses field for each record.
-    for rec in records:
-        rec["courses"] = mentor_tool_courses
-
     headers = [
         "email",
         "first_name",
@@ -134,27 +167,38 @@ def write_csv(records: list[dict], output_path: Path, mentor_tool_courses: str)
         "order_billing_type",
         "purchase_date",
     ]
+    # Rows in header order; the courses field comes from mentor_tool_courses
+    rows = (
+        (
+            rec["email"],
+            rec["first_name"],
+            rec["last_name"],
+            mentor_tool_courses,
+            rec["order_billing_type"],
+            rec["purchase_date"],
+        )
+        for rec in records
+    )
     
     with output_path.open("w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(
+        writer = csv.writer(
             csvfile,
-            fieldnames=headers,
             delimiter=";",
             quotechar='"',
             quoting=csv.QUOTE_ALL
         )
-        writer.writeheader()
-        writer.writerows(records)
+        writer.writerow(headers)
+        writer.writerows(rows)
     logger.info(f"CSV file saved at: {output_path}")
 
 
-def filter_admin_url_users(users: list[dict], course_id: int, admin_url_start_date: str) -> list[dict]:
+def filter_admin_url_users(users: Iterable[dict], course_id: int, admin_url_start_date: str) -> list[dict]:
     """
     Filters for users with role "student" for the given course_id where their enrolled_at date 
     is past the given start date.
  
     Args:
-        users: List of user dictionaries from the NDJSON file.
+        users: User dictionaries from the NDJSON file.
         course_id: Course ID to filter for.
         admin_url_start_date: A date string in "YYYY-MM-DD" format.
  
@@ -169,6 +213,9 @@ def filter_admin_url_users(users: list[dict], course_id: int, admin_url_start_da
     except Exception as e:
         logger.error(f"Invalid date format for admin-url-start-date '{admin_url_start_date}': {e}")
         return []
+    # Teachable exports enrollment times in UTC ('...Z'). For those, comparing the 'YYYY-MM-DD'
+    # prefix as a string is the same as comparing against midnight UTC, without building a datetime
+    start_day = start_date.date().isoformat()
 
     admin_records = []
     for user in users:
@@ -181,14 +228,18 @@ def filter_admin_url_users(users: list[dict], course_id: int, admin_url_start_da
                 enrolled_at_str = course.get("enrolled_at", "")
                 if not enrolled_at_str:
                     continue
-                try:
-                    # Parse the ISO timestamp and ensure it's timezone-aware
-                    dt = datetime.fromisoformat(enrolled_at_str.replace("Z", "+00:00"))
-                except Exception as e:
-                    logger.error(f"Error parsing enrolled_at timestamp '{enrolled_at_str}': {e}")
-                    continue
+                if is_utc_timestamp(enrolled_at_str):
+                    enrolled_after_start = enrolled_at_str[:10] >= start_day
+                else:
+                    try:
+                        # Parse the ISO timestamp and ensure it's timezone-aware
+                        dt = datetime.fromisoformat(enrolled_at_str)
+                    except Exception as e:
+                        logger.error(f"Error parsing enrolled_at timestamp '{enrolled_at_str}': {e}")
+                        continue
+                    enrolled_after_start = dt >= start_date
                 
-                if dt >= start_date:
+                if enrolled_after_start:
                     # Get the admin_url from the course-specific data
                     admin_url = course.get("admin_url", "")
                     if not admin_url:
@@ -215,13 +266,17 @@ def print_admin_urls(records: list[dict]) -> None:
         logger.info("No matching admin URL records found for the given start date.")
         return
 
-    print("\nAdmin URLs for enrolled students:")
-    print("-" * 80)
+    separator = "-" * 80
+    # Built up front and written once instead of four print() calls per record
+    lines = ["\nAdmin URLs for enrolled students:", separator]
     for record in records:
-        print(f"Name: {record['name']}")
-        print(f"Email: {record['email']}")
-        print(f"Admin URL: {record['admin_url']}")
-        print("-" * 80)
+        lines += (
+            f"Name: {record['name']}",
+            f"Email: {record['email']}",
+            f"Admin URL: {record['admin_url']}",
+            separator,
+        )
+    print("\n".join(lines))
 
 
 def main() -> None:
@@ -253,6 +308,7 @@ def main() -> None:
     )
 
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)-8s | %(message)s")
 
     # Verify that the input directory exists and users.ndjson is present.
     if not args.input.exists() or not args.input.is_dir():
@@ -264,10 +320,13 @@ def main() -> None:
         logger.error(f"users.ndjson not found in the provided directory: {args.input}")
         sys.exit(1)
 
-    users = load_users(ndjson_file)
-    if not users:
+    # Users are parsed lazily while the filter below walks them; peek once to catch an empty file
+    users = iter_users(ndjson_file)
+    first_user = next(users, None)
+    if first_user is None:
         logger.error("No users could be loaded from the input file.")
         sys.exit(1)
+    users = itertools.chain([first_user], users)
 
     # If admin URL start date is provided, only process admin URLs and exit
     if args.admin_url_start_date: